@@ -16,14 +16,22 @@ from __future__ import annotations
 
 """Sphinx documentation builder."""
 
+import ast
 import datetime
 import doctest
+import functools
 import importlib
 import inspect
+import operator
 import os
+import pickle
 import re
+import time
 from pathlib import Path
 
+from docutils.parsers.rst import Directive
+from sphinx.application import ENV_PICKLE_FILENAME
+
 
 project = "Qiskit"
 project_copyright = f"2017-{datetime.date.today().year}, Qiskit Development Team"
@@ -38,6 +46,11 @@ language = "en"
 
 rst_prolog = f".. |version| replace:: {version}"
 
+# Set `QISKIT_DOCS_MINIMAL=1` for faster local builds that skip the two most expensive extensions:
+# the plot directive (which runs the code of every plot) and reno (which collects the release notes
+# from the git history).  Such builds have no plots and no release notes page.
+QISKIT_DOCS_MINIMAL = os.environ.get("QISKIT_DOCS_MINIMAL", "0") == "1"
+
 extensions = [
     "sphinx.ext.napoleon",
     "sphinx.ext.autodoc",
@@ -46,10 +59,13 @@ extensions = [
     "sphinx.ext.doctest",
     # This is used by qiskit/documentation to generate links to github.com.
     "sphinx.ext.linkcode",
-    "matplotlib.sphinxext.plot_directive",
-    "reno.sphinxext",
     "sphinxcontrib.katex",
 ]
+if not QISKIT_DOCS_MINIMAL:
+    extensions += [
+        "matplotlib.sphinxext.plot_directive",
+        "reno.sphinxext",
+    ]
 
 templates_path = ["_templates"]
 
@@ -59,7 +75,22 @@ numfig = True
 numfig_format = {"table": "Table %s"}
 
 # Relative to source directory, affects general discovery, and html_static_path and html_extra_path.
-exclude_patterns = ["_build", "**.ipynb_checkpoints"]
+# Tooling state is excluded explicitly so that Sphinx doesn't have to walk it during discovery.  The
+# leading "**" (rather than "**/") also matches these at the top level of the source directory.
+exclude_patterns = [
+    "_build",
+    "**.ipynb_checkpoints",
+    "**.git",
+    "**__pycache__",
+    "**.tox",
+    "**.venv",
+    "**node_modules",
+    "**.mypy_cache",
+    "**.pytest_cache",
+]
+if QISKIT_DOCS_MINIMAL:
+    # Without reno, this page would only contain an error about its unknown directive.
+    exclude_patterns.append("release_notes.rst")
 
 
 # This adds the module name to e.g. function API docs. We use the default of True because our
@@ -78,15 +109,90 @@ modindex_common_prefix = ["qiskit."]
 # Intersphinx
 # ----------------------------------------------------------------------------------
 
+# Sphinx fetches all of these inventories concurrently in a thread pool (see
+# `sphinx.ext.intersphinx.load_mappings`), so a cold build doesn't pay for the sum of the remotes'
+# latencies.  A remote that fails to load is reported as a warning, and does not stop the others
+# from loading.
+_intersphinx_remotes = {
+    "rustworkx": "https://www.rustworkx.org/",
+    "qiskit-ibm-runtime": "https://docs.quantum.ibm.com/api/qiskit-ibm-runtime/",
+    "qiskit-aer": "https://qiskit.github.io/qiskit-aer/",
+    "numpy": "https://numpy.org/doc/stable/",
+    "matplotlib": "https://matplotlib.org/stable/",
+    "python": "https://docs.python.org/3/",
+}
+
+# Local copies of the inventories, written by `tools/refresh_intersphinx_inventories.py`.  Sphinx
+# tries the copy first, and falls back to the remote if the copy is missing or unreadable.  The copy
+# is listed even if it doesn't exist: Sphinx compares this mapping between builds and re-reads every
+# document if it changed, so it must not depend on the state of the cache.  The directory is removed
+# by `tox -e docs-clean` along with the rest of the build output, so stale copies don't outlive a
+# clean build.
+INTERSPHINX_CACHE = Path(__file__).resolve().parent / "_build" / ".intersphinx_cache"
+
 intersphinx_mapping = {
-    "rustworkx": ("https://www.rustworkx.org/", None),
-    "qiskit-ibm-runtime": ("https://docs.quantum.ibm.com/api/qiskit-ibm-runtime/", None),
-    "qiskit-aer": ("https://qiskit.github.io/qiskit-aer/", None),
-    "numpy": ("https://numpy.org/doc/stable/", None),
-    "matplotlib": ("https://matplotlib.org/stable/", None),
-    "python": ("https://docs.python.org/3/", None),
+    name: (uri, (str(INTERSPHINX_CACHE / f"{name}.inv"), None))
+    for name, uri in _intersphinx_remotes.items()
 }
 
+
+# Sphinx keeps the parsed inventories in the pickled build environment, and only fetches remote ones
+# again once they expire, but it reads and parses local files on every build.  For the duration of
+# the loading, leave out the local copies that the environment already holds an up-to-date parse of,
+# so those can be served from the environment like the remote ones.  The configured mapping must be
+# restored afterwards: it is pickled with the environment and compared on the next build, and any
+# change to it would make Sphinx re-read every document.
+#
+# Sphinx only pickles the environment when it re-read at least one document, so a build that parsed
+# an inventory without re-reading anything would lose the parse, and the next build would parse the
+# copy again.  In that case, the environment is saved once more at the end of the build.
+_configured_intersphinx_mapping = None
+_inventories_loading_started = None
+
+
+def _skip_loaded_inventory_copies(app):
+    global _configured_intersphinx_mapping  # pylint: disable=global-statement
+    global _inventories_loading_started  # pylint: disable=global-statement
+    _inventories_loading_started = time.time()
+    _configured_intersphinx_mapping = app.config.intersphinx_mapping
+    loaded = getattr(app.env, "intersphinx_cache", {})
+    expiry = time.time() - app.config.intersphinx_cache_limit * 86400
+    mapping = {}
+    for key, (name, (uri, invs)) in _configured_intersphinx_mapping.items():
+        copies = [inv for inv in invs if inv and "://" not in inv]
+        if copies and uri in loaded and loaded[uri][1] >= expiry:
+            loaded_at = loaded[uri][1]
+            # Sphinx truncates the time of loading to whole seconds.  A copy written in the same
+            # second as it was loaded may have changed afterwards, so that one is loaded again.
+            if all(
+                int(os.path.getmtime(copy)) < loaded_at for copy in copies if os.path.isfile(copy)
+            ):
+                invs = tuple(inv for inv in invs if inv not in copies) or (None,)
+        mapping[key] = (name, (uri, invs))
+    app.config.intersphinx_mapping = mapping
+
+
+def _restore_intersphinx_mapping(app):
+    app.config.intersphinx_mapping = _configured_intersphinx_mapping
+
+
+def _save_loaded_inventories(app, exception):
+    if exception is not None or _inventories_loading_started is None:
+        return
+    started = int(_inventories_loading_started)
+    loaded = getattr(app.env, "intersphinx_cache", {})
+    if not any(loaded_at >= started for _, loaded_at, _ in loaded.values()):
+        return
+    pickled = os.path.join(app.doctreedir, ENV_PICKLE_FILENAME)
+    if os.path.isfile(pickled) and os.path.getmtime(pickled) >= _inventories_loading_started:
+        # Sphinx already saved the environment during this build.
+        return
+    # The doctest shards of `tools/run_doctests.py` share the environment, so replace it in one go.
+    with open(f"{pickled}.part", "wb") as file:
+        pickle.dump(app.env, file, pickle.HIGHEST_PROTOCOL)
+    os.replace(f"{pickled}.part", pickled)
+
+
 # ----------------------------------------------------------------------------------
 # HTML theme
 # ----------------------------------------------------------------------------------
@@ -111,14 +217,43 @@ autodoc_typehints_description_target = "documented_params"
 
 autoclass_content = "both"
 
+# Generating the autosummary stubs is a large part of the build time, so local builds reuse the
+# stubs from a previous build if there are any (the first build always generates them).  Set
+# `QISKIT_DOCS_FULL=1` to generate the stubs of newly added objects; `tox -e docs` always does.
+#
+# The stubs are deliberately not committed: they follow the API of the installed Qiskit (including
+# its compiled extension), and `sphinx-autogen` can't produce them because it ignores
+# `autosummary_filename_map` below.
 autosummary_generate = True
 autosummary_generate_overwrite = False
 
+QISKIT_DOCS_FULL = os.environ.get("QISKIT_DOCS_FULL", "0") == "1"
+_STUBS_DIR = Path(__file__).resolve().parent / "stubs"
+
+
+# Sphinx re-reads every document if `autosummary_generate` differs from the previous build, so the
+# configured value (which may have been overridden on the command line) is restored once autosummary
+# has run, and generation is only switched off in between.
+_configured_autosummary_generate = None
+
+
+def _skip_stub_generation(app):
+    global _configured_autosummary_generate  # pylint: disable=global-statement
+    _configured_autosummary_generate = app.config.autosummary_generate
+    if not QISKIT_DOCS_FULL and _STUBS_DIR.is_dir():
+        app.config.autosummary_generate = False
+
+
+def _restore_autosummary_generate(app):
+    app.config.autosummary_generate = _configured_autosummary_generate
+
+
 # The pulse library contains some names that differ only in capitalization, during the changeover
 # surrounding SymbolPulse.  Since these resolve to autosummary filenames that also differ only in
 # capitalization, this causes problems when the documentation is built on an OS/filesystem that is
 # enforcing case-insensitive semantics.  This setting defines some custom names to prevent the clash
-# from happening.
+# from happening.  This must stay a plain `dict`: Sphinx pickles the configuration along with the
+# build environment, and read-only views such as `types.MappingProxyType` can't be pickled.
 autosummary_filename_map = {
     "qiskit.pulse.library.Constant": "qiskit.pulse.library.Constant_class.rst",
     "qiskit.pulse.library.Sawtooth": "qiskit.pulse.library.Sawtooth_class.rst",
@@ -163,32 +298,66 @@ doctest_test_doctest_blocks = ""
 plot_html_show_formats = False
 
 
+class _SkippedPlot(Directive):
+    """Stand-in for the plot directive in minimal builds, which outputs nothing."""
+
+    # With no `option_spec`, docutils doesn't parse the directive's options at all; they end up in
+    # the (ignored) argument instead, so every option of the real directive is accepted.
+    has_content = True
+    optional_arguments = 1
+    final_argument_whitespace = True
+
+    def run(self):
+        return []
+
+
 # ----------------------------------------------------------------------------------
 # Source code links
 # ----------------------------------------------------------------------------------
 
 REPO_ROOT = Path(__file__).resolve().parents[1]
+_REPO_ROOT_PREFIX = str(REPO_ROOT) + os.sep
+
+# Set by the docs deployment workflow, which maps release tags onto their stable branch.  This is
+# read once here rather than on every call to `linkcode_resolve`.
+GITHUB_BRANCH = os.environ.get("QISKIT_DOCS_GITHUB_BRANCH_NAME", "main")
+
+# When the docs are built by tox, Qiskit is imported from the tox virtual environment rather than
+# the repository, but the files in it still correspond to the files in the repository.
+_TOX_SITE_PACKAGES_RE = re.compile(r"\.tox\/.+\/site-packages\/")
+
+
+# Source links are only output by HTML builders (`sphinx.ext.linkcode` puts them in `only:: html`
+# nodes), so other builders, such as doctest and linkcheck, don't resolve them.  This is set by
+# `_configure_linkcode` once the builder is known.
+_linkcode_enabled = True
 
 
 def linkcode_resolve(domain, info):
-    if domain != "py":
+    if domain != "py" or not _linkcode_enabled:
         return None
-
+    # Only Qiskit's own objects get source links, so reject anything else before any lookups.
     module_name = info["module"]
-    if "qiskit" not in module_name:
+    if module_name != "qiskit" and not module_name.startswith("qiskit."):
         return None
+    return _resolve_source_link(module_name, info["fullname"])
 
-    try:
-        module = importlib.import_module(module_name)
-    except ModuleNotFoundError:
+
+# Sphinx calls `linkcode_resolve` for every signature it documents, and the same object can be
+# documented more than once (e.g. a class and its overloads), so cache the (fairly expensive)
+# source inspection.
+@functools.lru_cache(maxsize=None)
+def _resolve_source_link(module_name, fullname):
+    module = _import_module(module_name)
+    if module is None:
         return None
 
-    obj = module
-    for part in info["fullname"].split("."):
-        try:
-            obj = getattr(obj, part)
-        except AttributeError:
-            return None
+    try:
+        obj = operator.attrgetter(fullname)(module)
+    except AttributeError:
+        return None
+    # Link to the decorated function itself, not to the wrapper from the decorator's module.
+    obj = inspect.unwrap(obj)
 
     try:
         full_file_name = inspect.getsourcefile(obj)
@@ -196,19 +365,109 @@ def linkcode_resolve(domain, info):
         return None
     if full_file_name is None:
         return None
+    file_name = _repo_file_name(full_file_name)
+    if file_name is None:
+        return None
+
+    # Objects that don't come from a `def` or `class` statement (such as dynamically created
+    # classes) are linked to without a line range.
+    lines = _find_definition(obj, full_file_name)
+    linespec = "" if lines is None else f"#L{lines[0]}-L{lines[1]}"
+
+    return f"https://github.com/Qiskit/qiskit/tree/{GITHUB_BRANCH}/{file_name}{linespec}"
+
+
+# Python doesn't remember failed imports, so cache the result either way; every object documented
+# from a module that can't be imported (e.g. due to a missing optional dependency) would otherwise
+# search the whole import path again.
+@functools.lru_cache(maxsize=None)
+def _import_module(module_name):
     try:
-        relative_file_name = Path(full_file_name).resolve().relative_to(REPO_ROOT)
-        file_name = re.sub(r"\.tox\/.+\/site-packages\/", "", str(relative_file_name))
-    except ValueError:
+        return importlib.import_module(module_name)
+    except ImportError:
         return None
 
+
+# Most source files define many documented objects, so only resolve each file's path once.
+@functools.lru_cache(maxsize=None)
+def _repo_file_name(full_file_name):
+    full_file_name = os.path.realpath(full_file_name)
+    if not full_file_name.startswith(_REPO_ROOT_PREFIX):
+        return None
+    relative_file_name = full_file_name[len(_REPO_ROOT_PREFIX) :].replace(os.sep, "/")
+    return _TOX_SITE_PACKAGES_RE.sub("", relative_file_name)
+
+
+# Parsing each source file once and reading the line ranges of all its definitions off the AST is
+# much cheaper than asking `inspect` for the source of each object in it individually.
+@functools.lru_cache(maxsize=None)
+def _definition_lines(full_file_name):
+    """Map the qualified names of the classes and functions defined in a file to the first and last
+    lines (including any decorators) of each of their definitions, in source order."""
     try:
-        source, lineno = inspect.getsourcelines(obj)
-    except (OSError, TypeError):
-        linespec = ""
-    else:
-        ending_lineno = lineno + len(source) - 1
-        linespec = f"#L{lineno}-L{ending_lineno}"
-
-    github_branch = os.environ.get("QISKIT_DOCS_GITHUB_BRANCH_NAME", "main")
-    return f"https://github.com/Qiskit/qiskit/tree/{github_branch}/{file_name}{linespec}"
+        with open(full_file_name, encoding="utf-8") as file:
+            tree = ast.parse(file.read(), full_file_name)
+    except (OSError, SyntaxError, ValueError):
+        return {}
+    index = {}
+    _index_definitions(tree, "", index)
+    return index
+
+
+def _index_definitions(node, prefix, index):
+    for child in ast.iter_child_nodes(node):
+        if isinstance(child, (ast.FunctionDef, ast.AsyncFunctionDef, ast.ClassDef)):
+            qualname = prefix + child.name
+            start = min([child.lineno] + [decorator.lineno for decorator in child.decorator_list])
+            index.setdefault(qualname, []).append((start, child.end_lineno))
+            scope = "." if isinstance(child, ast.ClassDef) else ".<locals>."
+            _index_definitions(child, qualname + scope, index)
+        else:
+            _index_definitions(child, prefix, index)
+
+
+def _find_definition(obj, full_file_name):
+    definitions = _definition_lines(full_file_name)
+    spans = definitions.get(getattr(obj, "__qualname__", None), [])
+    # A name can be defined more than once (e.g. `typing.overload` stubs, or alternatives in an `if`
+    # statement).  Functions know exactly which definition they came from, even if their qualified
+    # name was changed after the fact; otherwise, the last definition is normally the one that is
+    # bound at runtime.
+    first_line = getattr(getattr(obj, "__code__", None), "co_firstlineno", None)
+    if first_line is not None:
+        candidates = spans or [span for name_spans in definitions.values() for span in name_spans]
+        span = next((span for span in candidates if span[0] == first_line), None)
+        if span is not None:
+            return span
+    return spans[-1] if spans else None
+
+
+def _configure_linkcode(app):
+    global _linkcode_enabled  # pylint: disable=global-statement
+    _linkcode_enabled = app.builder.format == "html"
+
+
+def _reread_docs_without_source_links(app, env, added, changed, removed):
+    # The doctree cache is shared between builders, so the documents read by a builder that skipped
+    # the source links must be read again by the next HTML build.
+    without_links = getattr(env, "qiskit_docs_without_source_links", set())
+    if not _linkcode_enabled:
+        env.qiskit_docs_without_source_links = without_links | added | changed
+        return []
+    env.qiskit_docs_without_source_links = set()
+    return sorted(without_links & env.found_docs)
+
+
+def setup(app):
+    # `sphinx.ext.intersphinx` loads the inventories at the default priority of 500.
+    app.connect("builder-inited", _skip_loaded_inventory_copies, priority=400)
+    app.connect("builder-inited", _restore_intersphinx_mapping, priority=600)
+    app.connect("build-finished", _save_loaded_inventories)
+    # `sphinx.ext.autosummary` generates the stubs at the default priority of 500.
+    app.connect("builder-inited", _skip_stub_generation, priority=400)
+    app.connect("builder-inited", _restore_autosummary_generate, priority=600)
+    app.connect("builder-inited", _configure_linkcode)
+    app.connect("env-get-outdated", _reread_docs_without_source_links)
+    if QISKIT_DOCS_MINIMAL:
+        # Silence the otherwise unknown directive, instead of reporting an error for every plot.
+        app.add_directive("plot", _SkippedPlot)
@@ -0,0 +1,51 @@
+#!/usr/bin/env python3
+# This code is part of Qiskit.
+#
+# (C) Copyright IBM 2024
+#
+# This code is licensed under the Apache License, Version 2.0. You may
+# obtain a copy of this license in the LICENSE.txt file in the root directory
+# of this source tree or at http://www.apache.org/licenses/LICENSE-2.0.
+#
+# Any modifications or derivative works of this code must retain this
+# copyright notice, and modified files need to carry a notice indicating
+# that they have been altered from the originals.
+
+"""Download the intersphinx inventories used by the documentation into the local cache.
+
+Sphinx reads the inventories from this cache instead of fetching them over the network on every
+clean build.  Re-run this script to pick up newer versions of the inventories."""
+
+import os
+import runpy
+import sys
+import urllib.request
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+CONF_PATH = os.path.join(REPO_ROOT, "docs", "conf.py")
+
+
+def _main():
+    conf = runpy.run_path(CONF_PATH)
+    cache = conf["INTERSPHINX_CACHE"]
+    cache.mkdir(parents=True, exist_ok=True)
+    failed = False
+    for name, uri in conf["_intersphinx_remotes"].items():
+        url = uri.rstrip("/") + "/objects.inv"
+        target = cache / f"{name}.inv"
+        partial = target.with_suffix(".inv.part")
+        try:
+            urllib.request.urlretrieve(url, partial)
+        except OSError as exc:
+            print(f"Failed to fetch '{url}': {exc}", file=sys.stderr)
+            partial.unlink(missing_ok=True)
+            failed = True
+            continue
+        # Only replace the old copy once the download is complete.
+        os.replace(partial, target)
+        print(f"{name}: {url} -> {target}")
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(_main())
@@ -0,0 +1,110 @@
+#!/usr/bin/env python3
+# This code is part of Qiskit.
+#
+# (C) Copyright IBM 2024
+#
+# This code is licensed under the Apache License, Version 2.0. You may
+# obtain a copy of this license in the LICENSE.txt file in the root directory
+# of this source tree or at http://www.apache.org/licenses/LICENSE-2.0.
+#
+# Any modifications or derivative works of this code must retain this
+# copyright notice, and modified files need to carry a notice indicating
+# that they have been altered from the originals.
+
+"""Run the Sphinx doctests of the documentation in parallel.
+
+The ``doctest`` builder of Sphinx runs all the tests serially.  This script first reads the
+documentation once (in parallel) into a shared doctree cache, then splits the source documents into
+shards and runs one ``sphinx-build -b doctest`` process per shard over that cache.
+
+Unlike the normal documentation build, this also tests the doctest blocks in docstrings.  Any
+arguments after ``--`` are passed on to every ``sphinx-build`` invocation."""
+
+import argparse
+import concurrent.futures
+import os
+import subprocess
+import sys
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+DOCS_DIR = os.path.join(REPO_ROOT, "docs")
+BUILD_DIR = os.path.join(DOCS_DIR, "_build", "doctest-parallel")
+DOCTREE_DIR = os.path.join(BUILD_DIR, ".doctrees")
+
+# Options shared by every Sphinx invocation.  These must be the same for the initial read and the
+# shards, or the shards will consider the cached environment out of date and re-read everything.
+SPHINX_OVERRIDES = ["-D", "doctest_test_doctest_blocks=default"]
+
+
+def _sphinx_build(builder, outdir, options=(), filenames=()):
+    cmd = [sys.executable, "-m", "sphinx", "-b", builder, "-d", DOCTREE_DIR, *SPHINX_OVERRIDES]
+    cmd.extend([*options, DOCS_DIR, outdir, *filenames])
+    return subprocess.run(cmd, capture_output=True, text=True, check=False)
+
+
+def discover_documents():
+    """Find all the source documents of the documentation (including generated stubs)."""
+    documents = []
+    for root, dirs, files in os.walk(DOCS_DIR):
+        dirs[:] = [d for d in dirs if not d.startswith((".", "_"))]
+        documents.extend(os.path.join(root, file) for file in files if file.endswith(".rst"))
+    return sorted(documents)
+
+
+def run_shard(index, documents, sphinx_args):
+    """Run the doctest builder on one shard of the documents."""
+    outdir = os.path.join(BUILD_DIR, f"shard{index}")
+    result = _sphinx_build("doctest", outdir, sphinx_args, documents)
+    try:
+        with open(os.path.join(outdir, "output.txt"), encoding="utf-8") as output:
+            report = output.read()
+    except OSError:
+        report = ""
+    return result.returncode, report, result.stderr
+
+
+def _main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n", maxsplit=1)[0])
+    parser.add_argument(
+        "-j",
+        "--jobs",
+        type=int,
+        default=max(1, (os.cpu_count() or 1) - 2),
+        help="number of parallel doctest processes (default: number of CPUs minus two)",
+    )
+    parser.add_argument("sphinx_args", nargs="*", help="extra arguments for sphinx-build")
+    args = parser.parse_args()
+
+    # Read (and generate the stubs of) the whole documentation once, so the shards don't each have
+    # to do it.  The "dummy" builder does nothing but populate the doctree cache.
+    print("Reading documentation...")
+    dummy_outdir = os.path.join(BUILD_DIR, "dummy")
+    result = _sphinx_build("dummy", dummy_outdir, ["-j", "auto", *args.sphinx_args])
+    if result.returncode:
+        print(result.stdout, result.stderr, sep="\n", file=sys.stderr)
+        return result.returncode
+
+    documents = discover_documents()
+    shards = [shard for shard in (documents[i :: args.jobs] for i in range(args.jobs)) if shard]
+    if not shards:
+        print("No documents found.", file=sys.stderr)
+        return 1
+    print(f"Running doctests of {len(documents)} documents in {len(shards)} processes...")
+
+    failed = False
+    with concurrent.futures.ProcessPoolExecutor(max_workers=len(shards)) as executor:
+        futures = [
+            executor.submit(run_shard, index, shard, args.sphinx_args)
+            for index, shard in enumerate(shards)
+        ]
+        for future in futures:
+            returncode, report, stderr = future.result()
+            if returncode:
+                failed = True
+                print(report, stderr, sep="\n", file=sys.stderr)
+    print("Some doctests failed." if failed else "All doctests passed.")
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(_main())